@@ -0,0 +1,65 @@
+import calendar
+import datetime as dt
+from functools import lru_cache
+
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+
+from .models import STATUS_APPROVED, TimesheetEntry, WeekSummary
+from .utils import get_current_week_bounds, heatmap_color
+
+WEEK_COLUMN_WIDTH = 22
+_WEEK_LABELS = ('M', 'T', 'W', 'T', 'F', 'S', 'S')
+
+
+@lru_cache(maxsize=4)
+def _month_labels(year):
+    """Month labels with precomputed margin; they only depend on the year."""
+    year_start = dt.date(year, 1, 1)
+    # Each week column consumes ~22px (16px block + gaps); calculate margins accordingly
+    return [
+        {"name": calendar.month_abbr[month], "margin": ((dt.date(year, month, 1) - year_start).days // 7) * WEEK_COLUMN_WIDTH}
+        for month in range(1, 13)
+    ]
+
+
+@lru_cache(maxsize=16)
+def _week_day_pairs(week_start):
+    """Week day pairs (label + date) for the week starting on week_start."""
+    return [{'date': week_start + dt.timedelta(days=i), 'label': _WEEK_LABELS[i]} for i in range(7)]
+
+
+def build_year_calendar(user, today):
+    """Return (cal_data, month_labels, week_day_pairs, this_week_hours, approved_this_week).
+
+    Not cached: the widget must reflect the user's own writes on the next page load,
+    whichever worker serves it. It costs one grouped query plus one WeekSummary read.
+    """
+    # Git-style Year Contribution
+    year_start = dt.date(today.year, 1, 1)
+    year_end = dt.date(today.year, 12, 31)
+    entries_qs = TimesheetEntry.objects.filter(
+        user=user, work_date__range=(year_start, year_end)
+    ).values("work_date").annotate(total_minutes=Coalesce(Sum("duration_minutes"), 0))
+
+    # iterate the cursor directly; the rows are only needed to fill hours_map
+    hours_map = {e["work_date"]: e["total_minutes"] / 60 for e in entries_qs.iterator(chunk_size=500)}
+
+    # Columns run Sunday..Saturday; the first column is cut short before Jan 1
+    days = [year_start + dt.timedelta(days=i) for i in range((year_end - year_start).days + 1)]
+    hours_list = [hours_map.get(d, 0) for d in days]
+    cells = [{"date": d, "hours": h, "color": heatmap_color(h)} for d, h in zip(days, hours_list)]
+    offset = (year_start.weekday() + 1) % 7  # days between the column's Sunday and Jan 1
+    cal_data = [cells[max(i, 0):i + 7] for i in range(-offset, len(cells), 7)]
+
+    month_labels = _month_labels(today.year)
+
+    week_start, _ = get_current_week_bounds(today)
+    week_day_pairs = _week_day_pairs(week_start)
+
+    # current week totals come from the denormalized WeekSummary row
+    week_summary = WeekSummary.objects.filter(user=user, week_start=week_start).values('status', 'total_minutes').first()
+    this_week_hours = round(week_summary['total_minutes'] / 60.0, 2) if week_summary else 0
+    approved_this_week = int(bool(week_summary) and week_summary['status'] == STATUS_APPROVED)
+
+    return cal_data, month_labels, week_day_pairs, this_week_hours, approved_this_week
@@ -1,7 +1,8 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import get_user_model
-from .models import TimesheetEntry, Project
+from .models import TimesheetEntry, Project, Profile, WeekSummary
+from django.db.models import Q
 from django.utils import timezone
 import datetime as _dt
 from django.core.exceptions import ValidationError
@@ -31,8 +32,13 @@ class SignUpForm(UserCreationForm):
 
 
 class TimesheetEntryForm(forms.ModelForm):
-    billable = forms.ChoiceField(
+    # Project is optional; the queryset is filled per instance in __init__
+    project = forms.ModelChoiceField(queryset=Project.objects.none(), required=False, empty_label="Unassigned", label="Project")
+    work_date = forms.DateField(widget=forms.DateInput(attrs={"type": "date", "required": True}), label="Work date")
+    break_minutes = forms.IntegerField(min_value=0, initial=0, widget=forms.NumberInput(attrs={"min": 0}), label="Break minutes")
+    billable = forms.TypedChoiceField(
         choices=[(True, "Yes"), (False, "No")],
+        coerce=lambda v: v in (True, "True", "true", 1, "1"),
         widget=forms.RadioSelect,
         label="Billable",
     )
@@ -51,35 +57,18 @@ class TimesheetEntryForm(forms.ModelForm):
             "billable",
             "notes",
         ]
-        widgets = {
-            "work_date": forms.DateInput(attrs={"type": "date", "required": True}),
-            "break_minutes": forms.NumberInput(attrs={"min": 0}),
-        }
 
     def __init__(self, *args, **kwargs):
         self.user = kwargs.pop("user", None)
         super().__init__(*args, **kwargs)
 
-        # Required fields
-        for field in ["work_date", "break_minutes", "billable"]:
-            self.fields[field].required = True
-        self.fields["notes"].required = False
-
-        # Project is optional
-        self.fields["project"].required = False
-        # Default queryset: active projects
-        qs = Project.objects.filter(active=True)
-        # If editing and the instance has a project that is inactive, include it so the field can show current value
-        try:
-            inst_proj = getattr(self.instance, 'project', None)
-            if inst_proj and inst_proj.pk and not qs.filter(pk=inst_proj.pk).exists():
-                qs = (Project.objects.filter(active=True) | Project.objects.filter(pk=inst_proj.pk)).distinct()
-        except Exception:
-            pass
-        self.fields["project"].queryset = qs
-        # Show an empty label for unassigned
-        if hasattr(self.fields["project"], 'empty_label'):
-            self.fields["project"].empty_label = "Unassigned"
+        # Active projects, plus the instance's current project if it has since been deactivated
+        # so the field can still show it. Lazy: queried once, when the select renders or validates.
+        active = Q(active=True)
+        inst_proj_id = getattr(self.instance, 'project_id', None)
+        if inst_proj_id:
+            active |= Q(pk=inst_proj_id)
+        self.fields["project"].queryset = Project.objects.filter(active)
 
         if self.user:
             self.instance.user = self.user
@@ -92,6 +81,8 @@ class TimesheetEntryForm(forms.ModelForm):
 
     def clean(self):
         cleaned = super().clean()
+        if self.instance.locked:
+            raise ValidationError('This entry belongs to an approved week and can no longer be changed.')
         work_date = cleaned.get('work_date')
         start_t = cleaned.get('start_time_time')
         end_t = cleaned.get('end_time_time')
@@ -102,51 +93,35 @@ class TimesheetEntryForm(forms.ModelForm):
             if work_date > today:
                 raise ValidationError('Work date cannot be in the future.')
 
-        # If times provided, ensure logical ordering
-        if start_t and end_t:
-            start_dt = _dt.datetime.combine(work_date, start_t)
-            end_dt = _dt.datetime.combine(work_date, end_t)
-            if end_dt <= start_dt:
-                raise ValidationError('End time must be after start time.')
+        # Approved weeks are closed: no entries may be added to or moved into them
+        if work_date and self.user and WeekSummary.is_approved(self.user, work_date):
+            raise ValidationError('That week has been approved; entries can no longer be added to it.')
 
-        # Prevent overlapping entries for this user on the same date
-        if self.user and work_date and start_t and end_t:
+        if work_date and start_t and end_t:
+            # Build the aware datetimes once; both checks below compare them
             tz = timezone.get_current_timezone()
-            new_start = timezone.make_aware(_dt.datetime.combine(work_date, start_t), tz)
-            new_end = timezone.make_aware(_dt.datetime.combine(work_date, end_t), tz)
-            qs = TimesheetEntry.objects.filter(user=self.user, work_date=work_date)
-            if self.instance and self.instance.pk:
-                qs = qs.exclude(pk=self.instance.pk)
-            for e in qs:
-                e_start = e.start_time
-                # If existing entry lacks a start_time, skip it (cannot reliably compare)
-                if not e_start:
-                    continue
-                e_end = e.end_time or (timezone.now() + _dt.timedelta(days=365))
-
-                # Ensure both sides are timezone-aware before comparing
-                tz = timezone.get_current_timezone()
-                try:
-                    from django.utils import timezone as dj_tz
-                    # normalize existing entry datetimes if naive
-                    if hasattr(e_start, 'tzinfo') and dj_tz.is_naive(e_start):
-                        e_start = dj_tz.make_aware(e_start, tz)
-                    if e_end and hasattr(e_end, 'tzinfo') and dj_tz.is_naive(e_end):
-                        e_end = dj_tz.make_aware(e_end, tz)
-                except Exception:
-                    # ignore normalization failures and rely on DB-stored datetimes
-                    pass
-
-                # overlap if not (new_end <= e_start or new_start >= e_end)
-                if not (new_end <= e_start or new_start >= e_end):
+            new_start = _dt.datetime.combine(work_date, start_t, tzinfo=tz)
+            new_end = _dt.datetime.combine(work_date, end_t, tzinfo=tz)
+
+            # Ensure logical ordering
+            if new_end <= new_start:
+                raise ValidationError('End time must be after start time.')
+
+            # Prevent overlapping entries for this user on the same date
+            if self.user:
+                exclude_pk = self.instance.pk if self.instance else None
+                if TimesheetEntry.overlapping(self.user.pk, work_date, new_start, new_end, exclude_pk=exclude_pk).exists():
                     raise ValidationError('This time range overlaps an existing entry.')
 
-        return cleaned
+        # A start without an end leaves the entry running; only one may run at a time
+        if start_t and not end_t and self.user:
+            running = TimesheetEntry.objects.filter(user=self.user, start_time__isnull=False, end_time__isnull=True)
+            if self.instance.pk:
+                running = running.exclude(pk=self.instance.pk)
+            if running.exists():
+                raise ValidationError('You already have a running timer; add an end time.')
 
-    def clean_billable(self):
-        """Convert 'True'/'False' string back to boolean."""
-        value = self.cleaned_data["billable"]
-        return value == "True"
+        return cleaned
 
     def save(self, commit=True):
         entry = super().save(commit=False)
@@ -169,9 +144,6 @@ class ProjectForm(forms.ModelForm):
         }
 
 
-from .models import Profile
-
-
 class ProfileForm(forms.ModelForm):
     class Meta:
         model = Profile
@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from timesheet_app.models import Profile
+
+
+class Command(BaseCommand):
+    help = "Create missing Profile rows for existing users in batched inserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        existing = Profile.objects.values_list("user_id", flat=True)
+        missing = User.objects.exclude(pk__in=existing).values_list("pk", flat=True)
+        created = Profile.objects.bulk_create(
+            [Profile(user_id=pk) for pk in missing],
+            batch_size=options["batch_size"],
+            ignore_conflicts=True,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Created {len(created)} profile(s)."))
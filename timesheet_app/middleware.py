@@ -0,0 +1,9 @@
+class RoleCacheMiddleware:
+    """Resolve request.user.role once per request (must run after AuthenticationMiddleware)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._cached_role = getattr(request.user, 'role', None)
+        return self.get_response(request)
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-15 05:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timesheet_app', '0008_timesheetentry_timesheet_a_user_id_12c63a_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='timesheetentry',
+            index=models.Index(fields=['work_date'], name='ts_workdate_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.5 on 2026-10-15 05:42
+
+import datetime
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def recompute_duration_minutes(apps, schema_editor):
+    # Rows saved before TimesheetEntry.save() derived the duration may not have the break subtracted
+    TimesheetEntry = apps.get_model('timesheet_app', 'TimesheetEntry')
+    finished = TimesheetEntry.objects.filter(start_time__isnull=False, end_time__isnull=False)
+    stale = []
+    for entry in finished.only('start_time', 'end_time', 'break_minutes', 'duration_minutes').iterator():
+        if entry.start_time is None or entry.end_time is None:
+            # legacy time-only values that don't parse as datetimes; leave their stored duration
+            continue
+        minutes = max(int((entry.end_time - entry.start_time).total_seconds() // 60) - (entry.break_minutes or 0), 0)
+        if entry.duration_minutes != minutes:
+            entry.duration_minutes = minutes
+            stale.append(entry)
+    TimesheetEntry.objects.bulk_update(stale, ['duration_minutes'], batch_size=500)
+
+
+def backfill_week_totals(apps, schema_editor):
+    TimesheetEntry = apps.get_model('timesheet_app', 'TimesheetEntry')
+    WeekSummary = apps.get_model('timesheet_app', 'WeekSummary')
+    totals = defaultdict(lambda: [0, 0, 0])
+    rows = TimesheetEntry.objects.values_list('user_id', 'work_date', 'duration_minutes', 'billable')
+    for user_id, work_date, minutes, billable in rows.iterator():
+        week_start = work_date - datetime.timedelta(days=work_date.weekday())
+        week = totals[(user_id, week_start)]
+        week[0] += minutes or 0
+        week[1] += (minutes or 0) if billable else 0
+        week[2] += 1
+    for (user_id, week_start), (total, billable_total, count) in totals.items():
+        WeekSummary.objects.update_or_create(
+            user_id=user_id,
+            week_start=week_start,
+            defaults={'total_minutes': total, 'billable_minutes': billable_total, 'entry_count': count},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timesheet_app', '0009_timesheetentry_ts_workdate_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weeksummary',
+            name='billable_minutes',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='weeksummary',
+            name='entry_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='weeksummary',
+            name='total_minutes',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(recompute_duration_minutes, migrations.RunPython.noop),
+        migrations.RunPython(backfill_week_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-15 05:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timesheet_app', '0010_weeksummary_billable_minutes_weeksummary_entry_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='timesheetentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('end_time__isnull', True), ('start_time__isnull', False)), fields=('user',), name='one_running_timer'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-15 05:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timesheet_app', '0011_timesheetentry_one_running_timer'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='weeksummary',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='weeksummary',
+            constraint=models.UniqueConstraint(fields=('user', 'week_start'), name='uniq_user_week'),
+        ),
+    ]
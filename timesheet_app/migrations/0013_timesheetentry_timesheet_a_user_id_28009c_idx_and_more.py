@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-15 05:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timesheet_app', '0012_alter_weeksummary_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='timesheetentry',
+            index=models.Index(fields=['user', 'work_date', 'project'], name='timesheet_a_user_id_28009c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weeksummary',
+            index=models.Index(fields=['status', 'approved_at'], name='timesheet_a_status_8da197_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-15 05:53
+
+import datetime
+
+from django.db import migrations, models
+
+
+def lock_approved_weeks(apps, schema_editor):
+    TimesheetEntry = apps.get_model('timesheet_app', 'TimesheetEntry')
+    WeekSummary = apps.get_model('timesheet_app', 'WeekSummary')
+    approved = WeekSummary.objects.filter(status='approved').values_list('user_id', 'week_start')
+    for user_id, week_start in approved.iterator():
+        TimesheetEntry.objects.filter(
+            user_id=user_id, work_date__range=(week_start, week_start + datetime.timedelta(days=6))
+        ).update(locked=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timesheet_app', '0013_timesheetentry_timesheet_a_user_id_28009c_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timesheetentry',
+            name='locked',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(lock_approved_weeks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-15 05:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timesheet_app', '0014_timesheetentry_locked'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='weeksummary',
+            index=models.Index(fields=['status', 'week_start'], name='timesheet_a_status_04504d_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+def create_covering_index(apps, schema_editor):
+    # INCLUDE columns are PostgreSQL-only; other backends would build a plain (user_id, work_date) duplicate
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX "ts_user_date_cov" ON "timesheet_app_timesheetentry" '
+            '("user_id", "work_date") INCLUDE ("duration_minutes", "billable")'
+        )
+
+
+def drop_covering_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS "ts_user_date_cov"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timesheet_app', '0015_weeksummary_timesheet_a_status_04504d_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='timesheetentry',
+            name='timesheet_a_user_id_627b48_idx',
+        ),
+        migrations.RunPython(create_covering_index, drop_covering_index),
+    ]
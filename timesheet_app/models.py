@@ -1,10 +1,19 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import AbstractUser
 from datetime import datetime
-from django.db.models.signals import post_save
+from django.core.files.base import ContentFile
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.functional import cached_property
+from .utils import get_current_week_bounds
+from PIL import Image, ImageOps
+import hashlib
+import io
 import os
 
 # ------------------- Constants -------------------
@@ -28,6 +37,7 @@ STATUS_CHOICES = [
     (STATUS_REJECTED, "Rejected"),
 ]
 
+
 # ------------------- Custom User -------------------
 class CustomUser(AbstractUser):
     """Custom user model with role selection"""
@@ -38,10 +48,13 @@ class CustomUser(AbstractUser):
 
 
 # ------------------- Profile (avatar) -------------------
+AVATAR_SIZE = (256, 256)
+
+
 def avatar_upload_to(instance, filename):
-    # store uploads under media/avatars/<username>/<filename>
+    # store uploads under media/avatars/<user_id>/<filename>; normalize_avatar names them by content hash
     base, ext = os.path.splitext(filename)
-    return f"avatars/{instance.user.username}/{base}{ext}"
+    return f"avatars/{instance.user_id}/{base}{ext}"
 
 
 class Profile(models.Model):
@@ -52,10 +65,41 @@ class Profile(models.Model):
         return f"Profile for {self.user.username}"
 
 
+@receiver(pre_save, sender=Profile)
+def normalize_avatar(sender, instance, **kwargs):
+    """Store a fresh upload as a 256px WebP keyed by content hash, reusing an identical stored file."""
+    avatar = instance.avatar
+    if not avatar or avatar._committed:
+        return
+    avatar.seek(0)
+    raw = avatar.read()
+    name = f"{hashlib.sha1(raw).hexdigest()[:16]}.webp"
+    path = avatar_upload_to(instance, name)
+    if avatar.storage.exists(path):
+        # same picture uploaded before: point at the stored copy, skip transcoding and upload
+        instance.avatar = path
+        return
+    try:
+        with Image.open(io.BytesIO(raw)) as img:
+            # bake the EXIF orientation into the pixels; the WebP output carries no EXIF tag
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail(AVATAR_SIZE)
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA")
+            buf = io.BytesIO()
+            img.save(buf, "WEBP", quality=80, method=6)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        # not something Pillow can (or will, past MAX_IMAGE_PIXELS) decode; keep the original upload untouched
+        avatar.seek(0)
+        return
+    instance.avatar = ContentFile(buf.getvalue(), name=name)
+
+
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
-        Profile.objects.create(user=instance)
+        with transaction.atomic():
+            Profile.objects.get_or_create(user=instance)
 
 # ------------------- Project -------------------
 class Project(models.Model):
@@ -76,6 +120,23 @@ class Project(models.Model):
         return f"{self.name} ({self.client})"
 
 # ------------------- Timesheet Entry -------------------
+class TimesheetQuerySet(models.QuerySet):
+    def with_relations(self):
+        """Join user and project so list templates don't query them per row."""
+        return self.select_related("user", "project")
+
+    def for_week(self, user, monday):
+        """Entries of user in the week starting on monday, with relations joined."""
+        return self.filter(user=user, work_date__range=get_current_week_bounds(monday)).with_relations()
+
+    def recent(self, user, limit=5):
+        """Latest entries of user, limited to the columns the recent-entries table shows."""
+        return self.filter(user=user).select_related("project").only(
+            "id", "work_date", "start_time", "end_time", "duration_minutes", "notes",
+            "project__id", "project__name",
+        ).order_by("-work_date", "-start_time")[:limit]
+
+
 class TimesheetEntry(models.Model):
     """Individual timesheet entry for an employee"""
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -88,16 +149,67 @@ class TimesheetEntry(models.Model):
     duration_minutes = models.PositiveIntegerField(default=0, editable=False)
     billable = models.BooleanField(default=True)
     notes = models.TextField(blank=True)
+    # Set in bulk when the entry's week is approved; cleared again on rejection
+    locked = models.BooleanField(default=False, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TimesheetQuerySet.as_manager()
+
     class Meta:
         indexes = [
-            models.Index(fields=["user", "work_date"]),
+            # (user, work_date) lookups use the prefix of the two indexes below. On PostgreSQL,
+            # migration 0016 adds ts_user_date_cov, a covering index for per-user report sums.
             models.Index(fields=["project", "work_date"]),
+            models.Index(fields=["user", "work_date", "start_time"]),
+            models.Index(fields=["user", "work_date", "project"]),
+            models.Index(fields=["work_date"], name="ts_workdate_idx"),
+        ]
+        constraints = [
+            # At most one running timer (started, not stopped) per user; its partial unique
+            # index also serves the running-timer lookups, which filter on the same condition
+            models.UniqueConstraint(
+                fields=["user"],
+                condition=Q(start_time__isnull=False, end_time__isnull=True),
+                name="one_running_timer",
+            ),
         ]
         ordering = ["work_date", "start_time"]
 
+    @classmethod
+    def overlapping(cls, user_id, work_date, start, end, exclude_pk=None):
+        """Entries of user_id on work_date whose time range intersects [start, end).
+
+        A running timer (no end_time yet) is treated as open-ended.
+        """
+        qs = cls.objects.filter(
+            user_id=user_id,
+            work_date=work_date,
+            start_time__lt=end,
+        ).filter(Q(end_time__gt=start) | Q(end_time__isnull=True))
+        if exclude_pk:
+            qs = qs.exclude(pk=exclude_pk)
+        return qs
+
+    @classmethod
+    def overlapping_in_range(cls, user_id, start_date, end_date):
+        """Finished entries of user_id between the dates that overlap another entry on the same day.
+
+        Checks a whole period (e.g. a week being submitted) in a single query.
+        """
+        clash = cls.objects.filter(
+            user_id=OuterRef("user_id"),
+            work_date=OuterRef("work_date"),
+            start_time__lt=OuterRef("end_time"),
+            end_time__gt=OuterRef("start_time"),
+        ).exclude(pk=OuterRef("pk"))
+        return cls.objects.filter(
+            user_id=user_id,
+            work_date__range=(start_date, end_date),
+            start_time__isnull=False,
+            end_time__isnull=False,
+        ).filter(Exists(clash))
+
     def clean(self):
         """Validate timesheet logic"""
         # Skip validation if required fields are missing. Use user_id to avoid RelatedObjectDoesNotExist
@@ -115,16 +227,66 @@ class TimesheetEntry(models.Model):
         if raw_minutes <= 0:
             raise ValidationError("Duration must be greater than zero after break.")
 
-        # Prevent overlapping entries for the same user/day
-        qs = TimesheetEntry.objects.filter(user=self.user, work_date=self.work_date)
-        if self.pk:
-            qs = qs.exclude(pk=self.pk)
-        for e in qs:
-            if not (self.end_time <= e.start_time or self.start_time >= e.end_time):
-                raise ValidationError("Overlapping entry for this day exists.")
+        # Prevent overlapping entries for the same user/day (single EXISTS probe)
+        if TimesheetEntry.overlapping(self.user_id, self.work_date, start_dt, end_dt, exclude_pk=self.pk).exists():
+            raise ValidationError("Overlapping entry for this day exists.")
+
+    def compute_duration_minutes(self):
+        """Worked minutes (end - start - break); 0 while the entry is still running."""
+        if not self.start_time or not self.end_time:
+            return 0
+        raw_minutes = int((self.end_time - self.start_time).total_seconds() // 60) - (self.break_minutes or 0)
+        return max(raw_minutes, 0)
+
+    @cached_property
+    def hours(self):
+        """Hours for display: elapsed time while running, otherwise the stored duration."""
+        if self.start_time and not self.end_time:
+            return round((timezone.now() - self.start_time).total_seconds() / 3600, 2)
+        return round((self.duration_minutes or 0) / 60.0, 2)
 
-        # Store duration_minutes for later calculations
-        self.duration_minutes = raw_minutes
+    def _week_totals(self):
+        """This entry's contribution to WeekSummary totals: (minutes, billable minutes)."""
+        minutes = self.duration_minutes or 0
+        return minutes, minutes if self.billable else 0
+
+    def save(self, *args, **kwargs):
+        # Derive duration_minutes on every save path (forms, timers, admin) so reports never see a stale value
+        self.duration_minutes = self.compute_duration_minutes()
+        # One transaction with the stored row locked: concurrent saves of the same entry (e.g. a
+        # double-clicked Stop) apply their deltas one after the other, and a failure rolls back both writes
+        with transaction.atomic():
+            previous = self._locked_stored_row() if self.pk else None
+            super().save(*args, **kwargs)
+
+            # Keep the denormalized WeekSummary totals in step with this entry
+            minutes, billable_minutes = self._week_totals()
+            if previous is None:
+                WeekSummary.add_to_totals(self.user_id, self.work_date, minutes, billable_minutes, 1)
+                return
+            old_minutes, old_billable = previous._week_totals()
+            if (previous.user_id, get_current_week_bounds(previous.work_date)[0]) == (self.user_id, get_current_week_bounds(self.work_date)[0]):
+                if (minutes, billable_minutes) != (old_minutes, old_billable):
+                    WeekSummary.add_to_totals(self.user_id, self.work_date, minutes - old_minutes, billable_minutes - old_billable, 0)
+            else:
+                WeekSummary.add_to_totals(previous.user_id, previous.work_date, -old_minutes, -old_billable, -1)
+                WeekSummary.add_to_totals(self.user_id, self.work_date, minutes, billable_minutes, 1)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            # Subtract what is stored, not this possibly stale instance; skip if another request deleted it first
+            stored = self._locked_stored_row()
+            result = super().delete(*args, **kwargs)
+            if stored is not None:
+                minutes, billable_minutes = stored._week_totals()
+                WeekSummary.add_to_totals(stored.user_id, stored.work_date, -minutes, -billable_minutes, -1)
+        return result
+
+    def _locked_stored_row(self):
+        """The stored copy of this entry (totals fields only), locked until the transaction ends."""
+        return TimesheetEntry.objects.select_for_update().filter(pk=self.pk).only(
+            "user_id", "work_date", "duration_minutes", "billable"
+        ).first()
 
     def __str__(self):
         return f"{self.user} · {self.project} · {self.work_date}"
@@ -147,9 +309,89 @@ class WeekSummary(models.Model):
     audit_note = models.TextField(blank=True)
     # Manager's comment or feedback when approving/rejecting
     manager_comment = models.TextField(blank=True, null=True)
+    # Denormalized totals, maintained by TimesheetEntry.save()/delete().
+    # Bulk queryset operations (update/delete/bulk_create) bypass them.
+    total_minutes = models.IntegerField(default=0, editable=False)
+    billable_minutes = models.IntegerField(default=0, editable=False)
+    entry_count = models.IntegerField(default=0, editable=False)
 
     class Meta:
-        unique_together = ("user", "week_start")
+        constraints = [
+            models.UniqueConstraint(fields=["user", "week_start"], name="uniq_user_week"),
+        ]
+        indexes = [
+            # approved-this-month count on the manager dashboard
+            models.Index(fields=["status", "approved_at"]),
+            # pending weeks on the manager dashboard, read in week order
+            models.Index(fields=["status", "week_start"]),
+        ]
+
+    @classmethod
+    def for_week(cls, user, week_start):
+        """The user's summary row for week_start, inserted as a draft if missing.
+
+        A hit costs one SELECT; on a miss the insert skips conflicts, so a
+        concurrent request creating the same week is not an error.
+        """
+        week = cls.objects.filter(user=user, week_start=week_start).first()
+        if week is None:
+            cls.insert_draft(user, week_start)
+            week = cls.objects.get(user=user, week_start=week_start)
+        return week
+
+    @classmethod
+    def insert_draft(cls, user, week_start):
+        """Insert the user's draft row for week_start unless one already exists."""
+        cls.objects.bulk_create([cls(user=user, week_start=week_start)], ignore_conflicts=True)
+
+    @classmethod
+    def is_approved(cls, user, day):
+        """Whether the user's week containing day has been approved (and so is closed to changes)."""
+        week_start, _ = get_current_week_bounds(day)
+        return cls.objects.filter(user=user, week_start=week_start, status=STATUS_APPROVED).exists()
+
+    @classmethod
+    def compute_totals(cls, user_id, week_start):
+        """Aggregate totals for the week straight from TimesheetEntry."""
+        return TimesheetEntry.objects.filter(
+            user_id=user_id, work_date__range=get_current_week_bounds(week_start)
+        ).aggregate(
+            total_minutes=Coalesce(Sum("duration_minutes"), 0),
+            billable_minutes=Coalesce(Sum("duration_minutes", filter=Q(billable=True)), 0),
+            entry_count=Count("pk"),
+        )
+
+    @classmethod
+    def add_to_totals(cls, user_id, work_date, minutes, billable_minutes, entries):
+        """Apply an incremental change to the totals of the week containing work_date."""
+        week_start, _ = get_current_week_bounds(work_date)
+        updated = cls.objects.filter(user_id=user_id, week_start=week_start).update(
+            total_minutes=F("total_minutes") + minutes,
+            billable_minutes=F("billable_minutes") + billable_minutes,
+            entry_count=F("entry_count") + entries,
+        )
+        if not updated:
+            # No summary row yet: create it from the entries already stored
+            cls.objects.get_or_create(
+                user_id=user_id, week_start=week_start, defaults=cls.compute_totals(user_id, week_start)
+            )
 
     def __str__(self):
         return f"{self.user} · {self.week_start} · {self.status}"
+
+
+def get_week_status(user, week_start, create=True):
+    """(status, total_minutes) of the user's week in one narrow read.
+
+    A missing row reads as an empty draft; with create it is also inserted, then read
+    back in case a concurrent request inserted it first. Deliberately uncached: a
+    submit or approve must show up on the very next request.
+    """
+    week = WeekSummary.objects.filter(user=user, week_start=week_start).values_list("status", "total_minutes")
+    row = week.first()
+    if row is None:
+        if not create:
+            return STATUS_DRAFT, 0
+        WeekSummary.insert_draft(user, week_start)
+        row = week.get()
+    return row
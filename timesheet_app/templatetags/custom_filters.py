@@ -1,7 +1,20 @@
+from bisect import bisect_right
+from functools import lru_cache
+
 from django import template
 
 register = template.Library()
 
+# Heatmap buckets: <=0 light grey, <2 light green, <4 medium green, else dark green
+_THRESHOLDS = (0, 2, 4)
+_COLORS = ('#ebedf0', '#9be9a8', '#40c463', '#30a14e')
+
+
+@lru_cache(maxsize=512)
+def _color(hours):
+    return _COLORS[bisect_right(_THRESHOLDS, hours)]
+
+
 @register.filter
 def color_from_hours(hours):
     """
@@ -11,16 +24,8 @@ def color_from_hours(hours):
     try:
         hours = float(hours)
     except (ValueError, TypeError):
-        return '#ebedf0'  # default (light grey)
-
-    if hours <= 0:
-        return '#ebedf0'  # light grey
-    elif hours < 2:
-        return '#9be9a8'  # light green
-    elif hours < 4:
-        return '#40c463'  # medium green
-    else:
-        return '#30a14e'  # dark green
+        return _COLORS[0]  # default (light grey)
+    return _color(hours if hours > 0 else -1)
 
 
 @register.filter
@@ -1,3 +1,204 @@
+import datetime as dt
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .forms import TimesheetEntryForm
+from .models import (
+    STATUS_APPROVED, STATUS_DRAFT, STATUS_REJECTED, STATUS_SUBMITTED, Project, TimesheetEntry, WeekSummary,
+)
+from .utils import get_current_week_bounds
 
 # Create your tests here.
+
+
+class TimesheetQuerySetTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("emp", password="pw", role="employee")
+        self.project = Project.objects.create(name="Apollo", client="NASA")
+        self.monday = dt.date(2024, 5, 6)
+        for day in range(3):
+            work_date = self.monday + dt.timedelta(days=day)
+            TimesheetEntry.objects.create(
+                user=self.user,
+                project=self.project,
+                work_date=work_date,
+                start_time=timezone.make_aware(dt.datetime.combine(work_date, dt.time(9))),
+                end_time=timezone.make_aware(dt.datetime.combine(work_date, dt.time(10))),
+            )
+
+    def test_for_week_joins_relations_in_one_query(self):
+        with self.assertNumQueries(1):
+            entries = list(TimesheetEntry.objects.for_week(self.user, self.monday))
+            names = [(e.project.name, e.user.username) for e in entries]
+        self.assertEqual(names, [("Apollo", "emp")] * 3)
+
+    def test_for_week_excludes_other_weeks(self):
+        self.assertFalse(TimesheetEntry.objects.for_week(self.user, self.monday + dt.timedelta(days=7)).exists())
+
+    def test_recent_renders_rows_in_one_query(self):
+        with self.assertNumQueries(1):
+            rows = [(e.work_date, e.project.name, e.notes, e.hours) for e in TimesheetEntry.objects.recent(self.user, limit=2)]
+        self.assertEqual([r[0] for r in rows], [self.monday + dt.timedelta(days=2), self.monday + dt.timedelta(days=1)])
+        self.assertEqual(rows[0][3], 1.0)
+
+
+class WeekSummaryTotalsTests(TestCase):
+    """The incremental totals kept by TimesheetEntry.save()/delete() must match compute_totals()."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("tot", password="pw", role="employee")
+        self.wednesday = dt.date(2024, 5, 8)
+
+    def _at(self, work_date, hour):
+        return timezone.make_aware(dt.datetime.combine(work_date, dt.time(hour)))
+
+    def assertTotalsConsistent(self):
+        for week in WeekSummary.objects.all():
+            expected = WeekSummary.compute_totals(week.user_id, week.week_start)
+            self.assertEqual(
+                (week.total_minutes, week.billable_minutes, week.entry_count),
+                (expected["total_minutes"], expected["billable_minutes"], expected["entry_count"]),
+                week.week_start,
+            )
+
+    def test_totals_follow_entry_changes(self):
+        day = self.wednesday
+        first = TimesheetEntry.objects.create(
+            user=self.user, work_date=day, start_time=self._at(day, 9), end_time=self._at(day, 11), billable=True,
+        )
+        second = TimesheetEntry.objects.create(
+            user=self.user, work_date=day, start_time=self._at(day, 12), end_time=self._at(day, 13),
+            billable=False, break_minutes=10,
+        )
+        self.assertTotalsConsistent()
+        week = WeekSummary.objects.get()
+        self.assertEqual((week.total_minutes, week.billable_minutes, week.entry_count), (170, 120, 2))
+
+        second.billable = True
+        second.save()
+        self.assertTotalsConsistent()
+
+        # moving an entry into the next week updates both summaries
+        next_day = day + dt.timedelta(days=7)
+        first.work_date, first.start_time, first.end_time = next_day, self._at(next_day, 9), self._at(next_day, 10)
+        first.save()
+        self.assertTotalsConsistent()
+        self.assertEqual(WeekSummary.objects.count(), 2)
+
+        second.delete()
+        self.assertTotalsConsistent()
+
+        # a running timer counts as an entry with no minutes until it is stopped
+        running = TimesheetEntry.objects.create(user=self.user, work_date=next_day, start_time=self._at(next_day, 14))
+        self.assertTotalsConsistent()
+        running.end_time = self._at(next_day, 15)
+        running.save()
+        self.assertTotalsConsistent()
+
+    def test_moving_an_entry_to_another_user(self):
+        other = get_user_model().objects.create_user("tot2", password="pw", role="employee")
+        day = self.wednesday
+        entry = TimesheetEntry.objects.create(user=self.user, work_date=day, start_time=self._at(day, 9), end_time=self._at(day, 10))
+        entry.user = other
+        entry.save()
+        self.assertTotalsConsistent()
+        self.assertEqual(WeekSummary.objects.get(user=other).total_minutes, 60)
+        self.assertEqual(WeekSummary.objects.get(user=self.user).entry_count, 0)
+
+    def test_stale_instances_apply_their_change_once(self):
+        day = self.wednesday
+        entry = TimesheetEntry.objects.create(user=self.user, work_date=day, start_time=self._at(day, 9))
+        # two requests holding the same running timer both stop it
+        for copy in (TimesheetEntry.objects.get(pk=entry.pk), TimesheetEntry.objects.get(pk=entry.pk)):
+            copy.end_time = self._at(day, 10)
+            copy.save()
+        self.assertEqual(WeekSummary.objects.get().total_minutes, 60)
+        # ...and both delete it
+        first, second = TimesheetEntry.objects.get(pk=entry.pk), TimesheetEntry.objects.get(pk=entry.pk)
+        first.delete()
+        second.delete()
+        self.assertTotalsConsistent()
+        self.assertEqual(WeekSummary.objects.get().entry_count, 0)
+
+
+class SubmitWeekTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("sub", password="pw", role="employee")
+        self.client.force_login(self.user)
+        self.week_start, _ = get_current_week_bounds()
+
+    def _submit_from(self, status):
+        WeekSummary.objects.update_or_create(user=self.user, week_start=self.week_start, defaults={"status": status})
+        self.client.post(reverse("submit_week"))
+        return WeekSummary.objects.get(user=self.user, week_start=self.week_start).status
+
+    def test_draft_and_rejected_weeks_are_submitted(self):
+        self.assertEqual(self._submit_from(STATUS_DRAFT), STATUS_SUBMITTED)
+        self.assertEqual(self._submit_from(STATUS_REJECTED), STATUS_SUBMITTED)
+
+    def test_approved_week_is_not_reopened(self):
+        self.assertEqual(self._submit_from(STATUS_APPROVED), STATUS_APPROVED)
+
+    def test_missing_week_is_created_submitted(self):
+        self.client.post(reverse("submit_week"))
+        self.assertEqual(WeekSummary.objects.get(user=self.user).status, STATUS_SUBMITTED)
+
+
+class ApprovedWeekLockTests(TestCase):
+    """Once a manager approves a week, none of its entries may be added, changed or removed."""
+
+    XHR = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"}
+
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user("lock", password="pw", role="employee")
+        self.manager = User.objects.create_user("boss", password="pw", role="manager")
+        self.today = timezone.localdate()
+        self.week_start, _ = get_current_week_bounds(self.today)
+
+    def _approve(self, week_start):
+        week = WeekSummary.for_week(self.user, week_start)
+        self.client.force_login(self.manager)
+        self.client.post(reverse("week_detail", args=[week.pk]), {"action": "approve"})
+        self.client.force_login(self.user)
+        week.refresh_from_db()
+        self.assertEqual(week.status, STATUS_APPROVED)
+        return week
+
+    def test_form_rejects_entries_in_an_approved_week(self):
+        monday = dt.date(2020, 1, 6)
+        self._approve(monday)
+        form = TimesheetEntryForm(
+            {"work_date": "2020-01-08", "break_minutes": 0, "billable": "True", "start_time_time": "09:00", "end_time_time": "10:00"},
+            user=self.user,
+        )
+        self.assertFalse(form.is_valid())
+
+    def test_locked_entry_cannot_be_deleted(self):
+        monday = dt.date(2020, 1, 6)
+        start = timezone.make_aware(dt.datetime(2020, 1, 7, 9))
+        entry = TimesheetEntry.objects.create(user=self.user, work_date=monday + dt.timedelta(days=1), start_time=start, end_time=start + dt.timedelta(hours=1))
+        week = self._approve(monday)
+        self.client.post(reverse("delete_time_entry", args=[entry.pk]))
+        self.assertTrue(TimesheetEntry.objects.filter(pk=entry.pk).exists())
+        week.refresh_from_db()
+        self.assertEqual((week.total_minutes, week.entry_count), (60, 1))
+
+    def test_timer_cannot_start_in_an_approved_week(self):
+        self._approve(self.week_start)
+        response = self.client.post(reverse("start_time_entry"), **self.XHR)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(TimesheetEntry.objects.filter(user=self.user).exists())
+
+    def test_locked_timer_cannot_be_stopped(self):
+        running = TimesheetEntry.objects.create(user=self.user, work_date=self.today, start_time=timezone.now() - dt.timedelta(hours=2))
+        week = self._approve(self.week_start)
+        response = self.client.post(reverse("stop_time_entry", args=[running.pk]), **self.XHR)
+        self.assertEqual(response.status_code, 400)
+        running.refresh_from_db()
+        self.assertIsNone(running.end_time)
+        week.refresh_from_db()
+        self.assertEqual(week.total_minutes, 0)
@@ -1,10 +1,66 @@
-from datetime import timedelta
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from django.http import HttpResponse
 from django.utils import timezone
+import orjson
+
+@lru_cache(maxsize=32)
+def _week_bounds(ordinal):
+    day = date.fromordinal(ordinal)
+    monday = day - timedelta(days=day.weekday())   # 0 = Monday
+    sunday = monday + timedelta(days=6)
+    return monday, sunday
+
 
 def get_current_week_bounds(today=None):
     """Return (monday, sunday) for current week."""
     if today is None:
         today = timezone.localdate()
-    monday = today - timedelta(days=today.weekday())   # 0 = Monday
-    sunday = monday + timedelta(days=6)
-    return monday, sunday
+    return _week_bounds(today.toordinal())
+
+
+class Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def json_response(payload, status=200):
+    """JSON HttpResponse encoded with orjson (used by the polled timer/summary endpoints)."""
+    return HttpResponse(orjson.dumps(payload), content_type="application/json", status=status)
+
+
+# Year-contribution heatmap buckets: 0, <2, <4, <6 and 6+ hours
+_HEATMAP_THRESHOLDS = (0, 2, 4, 6)
+_HEATMAP_COLORS = ('#ebedf0', '#c6e48b', '#7bc96f', '#239a3b', '#196127')
+
+
+@lru_cache(maxsize=512)
+def heatmap_color(hours):
+    """Background color of a heatmap cell for the given hours."""
+    if hours <= 0:
+        return _HEATMAP_COLORS[0]
+    return _HEATMAP_COLORS[bisect_right(_HEATMAP_THRESHOLDS, hours)]
+
+
+# Date formats accepted in report query strings, after ISO (e.g. "July 20, 2025", "07/20/2025")
+_DATE_FORMATS = ("%Y-%m-%d", "%B %d, %Y", "%b %d, %Y", "%m/%d/%Y", "%d-%m-%Y")
+
+
+@lru_cache(maxsize=256)
+def parse_query_date(s):
+    """Parse a report date from the query string; None if no format matches."""
+    # Normalize common query formats (remove dots from abbreviated months like 'Aug.')
+    s_clean = s.replace('.', '').strip()
+    try:
+        return date.fromisoformat(s_clean)
+    except ValueError:
+        pass
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(s_clean, fmt).date()
+        except ValueError:
+            continue
+    return None
@@ -4,26 +4,95 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import Group
 from django.contrib.auth.views import LoginView
 from django.contrib import messages
-from django.db.models import Sum
-from django.db.models.functions import Coalesce
+from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, Q, Sum, Value, When, Window
+from django.db.models.functions import Coalesce, RowNumber
 from django.utils import timezone
-from django.http import HttpResponse
-from collections import defaultdict
+from django.http import StreamingHttpResponse
 import csv
 import datetime as dt
-import calendar
+import orjson
 
-from .models import TimesheetEntry, Project, WeekSummary, STATUS_DRAFT, STATUS_SUBMITTED, STATUS_APPROVED, STATUS_REJECTED
+from .models import (
+    TimesheetEntry, Project, Profile, WeekSummary, STATUS_DRAFT, STATUS_SUBMITTED, STATUS_APPROVED, STATUS_REJECTED, ROLE_MANAGER,
+    get_week_status,
+)
 from .forms import SignUpForm, TimesheetEntryForm, ProjectForm
 from .decorators import role_required
-from .utils import get_current_week_bounds
+from .utils import Echo, get_current_week_bounds, json_response, parse_query_date
+from .dashboard_widgets import build_year_calendar
 from django.template.loader import render_to_string
 from django.urls import reverse
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.http import Http404
 from django.contrib.auth import logout as auth_logout
 
 User = get_user_model()
 
+# CSV exports are streamed row by row. csv.writer over Echo just returns each
+# formatted line, so the writers are shared; the BOM lets Excel detect UTF-8.
+_CSV_WRITER = csv.writer(Echo(), lineterminator="\n")
+_CSV_WRITER_CRLF = csv.writer(Echo())  # hours_by_project.csv keeps csv's default line ending
+CSV_BOM = "\ufeff"
+DETAIL_CSV_HEADER = ("Date", "Project", "Start", "End", "Break (min)", "Hours", "Notes")
+SUMMARY_CSV_HEADER = ("Project", "Total Hours")
+PROJECT_HOURS_CSV_HEADER = ("Project", "Hours", "Billable Hours", "% Billable")
+
+
+def _csv_response(lines, filename):
+    response = StreamingHttpResponse(lines, content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _detail_csv_lines(entries_qs):
+    yield CSV_BOM
+    yield _CSV_WRITER.writerow(DETAIL_CSV_HEADER)
+    # the DB folds entries without a project into "Unassigned"
+    for e in entries_qs.annotate(pname=Coalesce("project__name", Value("Unassigned"))).iterator(chunk_size=2000):
+        date_str = e.work_date.strftime("%d-%m-%Y") if e.work_date else ""
+        start_str = e.start_time.strftime("%H:%M") if e.start_time else ""
+        end_str = e.end_time.strftime("%H:%M") if e.end_time else ""
+        yield _CSV_WRITER.writerow([date_str, e.pname, start_str, end_str, str(e.break_minutes or 0), f"{float(e.hours):.2f}", e.notes or ""])
+
+
+def _summary_csv_lines(summary_rows):
+    yield CSV_BOM
+    yield _CSV_WRITER.writerow(SUMMARY_CSV_HEADER)
+    for row in summary_rows:
+        yield _CSV_WRITER.writerow([row["name"], f"{row['hours']:.2f}"])
+
+
+def _project_hours_csv_lines(rows):
+    yield CSV_BOM
+    yield _CSV_WRITER_CRLF.writerow(PROJECT_HOURS_CSV_HEADER)
+    for r in rows:
+        yield _CSV_WRITER_CRLF.writerow([r['project'], f"{r['hours']:.2f}", f"{r['billable_hours']:.2f}", f"{r['percent_billable']:.2f}"])
+
+
+def _query_date(request, value, default):
+    """Report date from a query string value; default, with a warning, if it doesn't parse."""
+    if not value:
+        return default
+    parsed = parse_query_date(value)
+    if parsed is None:
+        # Fall back to default and warn the user instead of raising an exception
+        messages.warning(request, f"Could not parse date '{value}'; using default range.")
+        return default
+    return parsed
+
+
+def _running_timer_html(request, running_timer, start_name, stop_name):
+    """Render the running-timer card for AJAX timer responses.
+
+    The project picker only appears when no timer is running, so active projects
+    are fetched (once, id/name only) just for that case.
+    """
+    context = {"running_timer": running_timer, "start_name": start_name, "stop_name": stop_name}
+    if running_timer is None:
+        context["projects"] = list(Project.objects.filter(active=True).only("id", "name"))
+    return render_to_string("dashboard/_running_timer.html", context, request=request)
+
 
 @role_required('manager')
 @login_required
@@ -32,13 +101,13 @@ def manager_employee_detail(request, user_id):
     employee = get_object_or_404(User, pk=user_id)
     # projects this employee has entries for (last 90 days)
     start = timezone.localdate() - dt.timedelta(days=90)
-    entries = TimesheetEntry.objects.filter(user=employee, work_date__gte=start).select_related('project')
-    proj_map = {}
-    for e in entries:
-        name = e.project.name if e.project else 'Unassigned'
-        proj_map.setdefault(name, 0.0)
-        proj_map[name] += (e.duration_minutes or 0) / 60.0
-    proj_rows = [{'project': k, 'hours': round(v, 2)} for k, v in proj_map.items()]
+    proj_totals = (
+        TimesheetEntry.objects.filter(user=employee, work_date__gte=start)
+        .order_by()
+        .values(pname=Coalesce('project__name', Value('Unassigned')))
+        .annotate(total_minutes=Coalesce(Sum('duration_minutes'), 0))
+    )
+    proj_rows = [{'project': r['pname'], 'hours': round(r['total_minutes'] / 60.0, 2)} for r in proj_totals]
     return render(request, 'dashboard/manager_employee_detail.html', {'employee': employee, 'proj_rows': proj_rows})
 
 
@@ -49,17 +118,11 @@ def manager_employee_reports(request):
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
     today = dt.date.today()
-    try:
-        start = dt.date.fromisoformat(start_date) if start_date else today - dt.timedelta(days=30)
-    except Exception:
-        start = today - dt.timedelta(days=30)
-    try:
-        end = dt.date.fromisoformat(end_date) if end_date else today
-    except Exception:
-        end = today
+    start = (start_date and parse_query_date(start_date)) or today - dt.timedelta(days=30)
+    end = (end_date and parse_query_date(end_date)) or today
 
     # Only include entries for users who are in the Employee group (exclude managers)
-    qs = TimesheetEntry.objects.filter(work_date__range=(start, end), user__groups__name='Employee').select_related('project', 'user')
+    qs = TimesheetEntry.objects.filter(work_date__range=(start, end), user__groups__name='Employee')
     # Optional project filter
     proj_id = request.GET.get('project')
     if proj_id:
@@ -67,25 +130,28 @@ def manager_employee_reports(request):
             qs = qs.filter(project_id=int(proj_id))
         except ValueError:
             pass
-    rows = []
-    emp_proj = {}
-    billable = {}
-    for e in qs:
-        key = (e.user.username, e.project.name if e.project else 'Unassigned')
-        emp_proj.setdefault(key, 0.0)
-        emp_proj[key] += (e.duration_minutes or 0) / 60.0
-        if e.billable:
-            billable.setdefault(key, 0.0)
-            billable[key] += (e.duration_minutes or 0) / 60.0
-
-    for (username, project), hrs in emp_proj.items():
-        bill = billable.get((username, project), 0.0)
-        pct = round((bill / hrs * 100) if hrs else 0, 2)
-        rows.append({'employee': username, 'project': project, 'hours': round(hrs, 2), 'billable_hours': round(bill, 2), 'percent_billable': pct})
+    # One GROUP BY (employee, project) row with total and billable minutes
+    totals = (
+        qs.order_by()
+        .values('user__username', pname=Coalesce('project__name', Value('Unassigned')))
+        .annotate(
+            total_minutes=Coalesce(Sum('duration_minutes'), 0),
+            billable_minutes=Sum(Case(When(billable=True, then=F('duration_minutes')), default=Value(0), output_field=IntegerField())),
+        )
+    )
+    rows = [
+        {
+            'employee': r['user__username'],
+            'project': r['pname'],
+            'hours': round(r['total_minutes'] / 60.0, 2),
+            'billable_hours': round((r['billable_minutes'] or 0) / 60.0, 2),
+            'percent_billable': round(100 * (r['billable_minutes'] or 0) / r['total_minutes'], 2) if r['total_minutes'] else 0,
+        }
+        for r in totals
+    ]
 
     projects = Project.objects.all().order_by('name')
-    import json
-    rows_json = json.dumps(rows)
+    rows_json = orjson.dumps(rows).decode()
     context = {'rows': rows, 'rows_json': rows_json, 'projects': projects, 'start': start, 'end': end}
     return render(request, 'dashboard/manager_employee_reports.html', context)
 
@@ -102,13 +168,11 @@ def manager_add_edit_entry(request, entry_id=None):
             obj.user = request.user
             start_time_field = form.cleaned_data.get('start_time_time')
             end_time_field = form.cleaned_data.get('end_time_time')
+            tz = timezone.get_current_timezone()
             if start_time_field:
-                obj.start_time = timezone.make_aware(dt.datetime.combine(obj.work_date, start_time_field))
+                obj.start_time = dt.datetime.combine(obj.work_date, start_time_field, tzinfo=tz)
             if end_time_field:
-                obj.end_time = timezone.make_aware(dt.datetime.combine(obj.work_date, end_time_field))
-            if obj.start_time and obj.end_time:
-                delta = obj.end_time - obj.start_time
-                obj.duration_minutes = int(delta.total_seconds() / 60)
+                obj.end_time = dt.datetime.combine(obj.work_date, end_time_field, tzinfo=tz)
             obj.save()
             messages.success(request, "✅ Time entry saved successfully.")
             # Redirect to manager timesheet and show the week containing the saved entry
@@ -149,33 +213,17 @@ def manager_my_timesheet(request):
     else:
         week_start, week_end = get_current_week_bounds()
     # Show newest entries first so recently added items appear at top
-    entries = TimesheetEntry.objects.filter(
-        user=request.user,
-        work_date__range=(week_start, week_end)
-    ).order_by("-work_date", "-start_time")
+    entries = TimesheetEntry.objects.for_week(request.user, week_start).order_by("-work_date", "-start_time")
 
-    week_summary, _ = WeekSummary.objects.get_or_create(
-        user=request.user, week_start=week_start, defaults={"status": STATUS_DRAFT}
-    )
-
-    for e in entries:
-        if e.duration_minutes is not None:
-            e.hours = round(e.duration_minutes / 60.0, 2)
-        elif e.start_time and e.end_time:
-            delta = e.end_time - e.start_time
-            e.hours = round(delta.total_seconds() / 3600, 2)
-        else:
-            e.hours = 0
-
-    total_minutes = entries.aggregate(total_minutes=Coalesce(Sum("duration_minutes"), 0))["total_minutes"]
-    total_hours = round((total_minutes or 0) / 60.0, 2)
+    week_status, total_minutes = get_week_status(request.user, week_start)
+    total_hours = round(total_minutes / 60.0, 2)
 
     context = {
         "entries": entries,
         "week_start": week_start,
         "week_end": week_end,
         "total_hours": total_hours,
-        "week_status": week_summary.status,
+        "week_status": week_status,
     }
     return render(request, "dashboard/manager_mytimesheet.html", context)
 
@@ -192,35 +240,13 @@ def manager_my_reports(request):
     project_id = request.GET.get("project")
 
     today = dt.date.today()
-    def _parse_query_date(s, default):
-        if not s:
-            return default
-        s_clean = s.replace('.', '').strip()
-        formats = [
-            "%Y-%m-%d",
-            "%B %d, %Y",
-            "%b %d, %Y",
-            "%m/%d/%Y",
-            "%d-%m-%Y",
-        ]
-        for fmt in formats:
-            try:
-                return dt.datetime.strptime(s_clean, fmt).date()
-            except Exception:
-                continue
-        try:
-            return dt.date.fromisoformat(s_clean)
-        except Exception:
-            messages.warning(request, f"Could not parse date '{s}'; using default range.")
-            return default
-
-    start_date_obj = _parse_query_date(start_date, today - dt.timedelta(days=30))
-    end_date_obj = _parse_query_date(end_date, today)
+    start_date_obj = _query_date(request, start_date, today - dt.timedelta(days=30))
+    end_date_obj = _query_date(request, end_date, today)
 
     entries_qs = TimesheetEntry.objects.filter(
         user=user,
         work_date__range=(start_date_obj, end_date_obj)
-    ).order_by("work_date", "start_time")
+    ).select_related("project").order_by("work_date", "start_time")
 
     if project_id:
         try:
@@ -228,52 +254,31 @@ def manager_my_reports(request):
         except ValueError:
             pass
 
-    entries = []
-    for e in entries_qs:
-        if e.duration_minutes is not None:
-            e.hours = round(e.duration_minutes / 60.0, 2)
-        else:
-            e.hours = 0
-        entries.append(e)
-
-    summary_dict = defaultdict(float)
-    for e in entries:
-        name = e.project.name if e.project else "Unassigned"
-        summary_dict[name] += e.hours
-    summary_rows = [{"name": k, "hours": round(v, 2)} for k, v in summary_dict.items()]
-
-    chart_dict = defaultdict(float)
-    for e in entries:
-        chart_dict[e.work_date.strftime("%d-%m-%Y")] += e.hours
-    chart_labels = list(chart_dict.keys())
-    chart_data = [chart_dict[d] for d in chart_labels]
-
     export = request.GET.get("export", "").lower()
-    if export in {"summary", "details"}:
-        filename = f"timesheet_{export}.csv"
-        response = HttpResponse(content_type="text/csv; charset=utf-8")
-        response["Content-Disposition"] = f'attachment; filename="{filename}"'
-        response.write('\ufeff')
-        writer = csv.writer(response, lineterminator='\n')
-        if export == "summary":
-            writer.writerow(["Project", "Total Hours"])
-            for row in summary_rows:
-                writer.writerow([str(row.get('name','')), f"{float(row.get('hours',0)):.2f}"])
-        else:
-            writer.writerow(["Date", "Project", "Start", "End", "Break (min)", "Hours", "Notes"])
-            for e in entries:
-                date_str = e.work_date.strftime("%d-%m-%Y") if getattr(e, 'work_date', None) else ""
-                project_name = e.project.name if getattr(e, 'project', None) else "Unassigned"
-                start_str = e.start_time.strftime("%H:%M") if getattr(e, 'start_time', None) else ""
-                end_str = e.end_time.strftime("%H:%M") if getattr(e, 'end_time', None) else ""
-                break_min = getattr(e, 'break_minutes', 0) or 0
-                hours_val = getattr(e, 'hours', 0) or 0
-                notes = getattr(e, 'notes', '') or ''
-                writer.writerow([date_str, project_name, start_str, end_str, str(break_min), f"{float(hours_val):.2f}", notes])
-        return response
+    if export == "details":
+        # stream straight off the cursor so a long range is never held in memory
+        return _csv_response(_detail_csv_lines(entries_qs), "timesheet_details.csv")
+
+    # Summary: per-project totals grouped in SQL
+    summary_totals = (
+        entries_qs.order_by("project__name")
+        .values(pname=Coalesce("project__name", Value("Unassigned")))
+        .annotate(total_minutes=Coalesce(Sum("duration_minutes"), 0))
+    )
+    summary_rows = [{"name": r["pname"], "hours": round(r["total_minutes"] / 60.0, 2)} for r in summary_totals]
+
+    if export == "summary":
+        return _csv_response(_summary_csv_lines(summary_rows), "timesheet_summary.csv")
+
+    # Chart data: per-day totals grouped in SQL
+    chart_rows = list(
+        entries_qs.order_by("work_date").values("work_date").annotate(total_minutes=Coalesce(Sum("duration_minutes"), 0))
+    )
+    chart_labels = [r["work_date"].strftime("%d-%m-%Y") for r in chart_rows]
+    chart_data = [round(r["total_minutes"] / 60.0, 2) for r in chart_rows]
 
     context = {
-        "entries": entries,
+        "entries": entries_qs,
         "projects": projects,
         "summary_rows": summary_rows,
         "chart_labels": chart_labels,
@@ -291,22 +296,28 @@ def manager_start_time_entry(request):
     # Similar to start_time_entry but for managers starting their own timer via manager UI
     user = request.user
     today = timezone.localdate()
-    overlapping = TimesheetEntry.objects.filter(user=user, end_time__isnull=True).exists()
-    if overlapping:
-        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-            return JsonResponse({'error': 'running'}, status=400)
-        messages.warning(request, 'You already have a running timer!')
-        return redirect('manager_dashboard')
-
     if request.method == 'POST':
         project_id = request.POST.get('project')
         notes = request.POST.get('notes', '')
         project = Project.objects.filter(id=project_id).first() if project_id else None
-        entry = TimesheetEntry.objects.create(user=user, project=project, start_time=timezone.now(), work_date=today, notes=notes, duration_minutes=0)
+        if WeekSummary.is_approved(user, today):
+            if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+                return json_response({'error': 'approved'}, status=400)
+            messages.error(request, 'Cannot start timer: this week has already been approved.')
+            return redirect('manager_dashboard')
+        # the one_running_timer constraint rejects a second running timer, no pre-check needed
+        try:
+            with transaction.atomic():
+                entry = TimesheetEntry.objects.create(user=user, project=project, start_time=timezone.now(), work_date=today, notes=notes)
+        except IntegrityError:
+            if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+                return json_response({'error': 'running'}, status=400)
+            messages.warning(request, 'You already have a running timer!')
+            return redirect('manager_dashboard')
         # Return JSON fragment similar to employee handler
         if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-            running_html = render_to_string('dashboard/_running_timer.html', {'running_timer': entry, 'projects': Project.objects.filter(active=True)}, request=request)
-            return JsonResponse({'running_html': running_html, 'start_ms': int(entry.start_time.timestamp() * 1000)})
+            running_html = _running_timer_html(request, entry, 'manager_start_time_entry', 'manager_stop_time_entry')
+            return json_response({'running_html': running_html, 'start_ms': int(entry.start_time.timestamp() * 1000)})
     return redirect('manager_dashboard')
 
 
@@ -318,17 +329,19 @@ def manager_stop_time_entry(request, entry_id):
     if entry.end_time:
         messages.warning(request, 'This timer is already stopped!')
         return redirect('manager_dashboard')
+    if entry.locked:
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            return json_response({'error': 'locked'}, status=400)
+        messages.error(request, 'This entry belongs to an approved week and can no longer be changed.')
+        return redirect('manager_dashboard')
     entry.end_time = timezone.now()
-    delta = entry.end_time - entry.start_time
-    entry.duration_minutes = int(delta.total_seconds() / 60)
-    entry.hours = round(delta.total_seconds() / 3600, 2)
     entry.save()
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        recent_entries = TimesheetEntry.objects.filter(user=user).order_by('-work_date', '-start_time')[:5]
+        recent_entries = TimesheetEntry.objects.recent(user)
         recent_html = render_to_string('dashboard/_recent_entries.html', {'recent_entries': recent_entries}, request=request)
-        running_timer = TimesheetEntry.objects.filter(user=user, end_time__isnull=True).order_by('-start_time').first()
-        running_html = render_to_string('dashboard/_running_timer.html', {'running_timer': running_timer, 'projects': Project.objects.filter(active=True)}, request=request)
-        return JsonResponse({'recent_html': recent_html, 'running_html': running_html})
+        # the only running timer was just stopped, so render the start form directly
+        running_html = _running_timer_html(request, None, 'manager_start_time_entry', 'manager_stop_time_entry')
+        return json_response({'recent_html': recent_html, 'running_html': running_html})
     messages.success(request, f'Timer stopped! Total hours: {entry.hours}')
     return redirect('manager_dashboard')
 
@@ -338,7 +351,6 @@ def upload_profile_picture(request):
         avatar = request.FILES.get('avatar')
         profile = getattr(request.user, 'profile', None)
         if not profile:
-            from .models import Profile
             profile = Profile.objects.create(user=request.user)
         if avatar:
             profile.avatar = avatar
@@ -360,12 +372,12 @@ def logout_view(request):
 @login_required
 def weekly_summary_fragment(request):
     # Returns JSON with this week's total hours and approved count for user
-    week_start, week_end = get_current_week_bounds()
-    entries = TimesheetEntry.objects.filter(user=request.user, work_date__range=(week_start, week_end))
-    total_minutes = entries.aggregate(total_minutes=Coalesce(Sum('duration_minutes'), 0))['total_minutes'] or 0
+    # WeekSummary carries both the status and the denormalized week total; this endpoint polls,
+    # so it only reads (a week with no row yet reports as an empty draft)
+    week_start, _ = get_current_week_bounds()
+    week_status, total_minutes = get_week_status(request.user, week_start, create=False)
     total_hours = round(total_minutes / 60.0, 2)
-    approved = WeekSummary.objects.filter(user=request.user, week_start=week_start, status=STATUS_APPROVED).exists()
-    return JsonResponse({'this_week_hours': total_hours, 'approved': int(bool(approved))})
+    return json_response({'this_week_hours': total_hours, 'approved': int(week_status == STATUS_APPROVED)})
 
 # ------------------- Public Views -------------------
 def home_view(request):
@@ -397,7 +409,9 @@ class CustomLoginView(LoginView):
 # ------------------- Post Login Redirect -------------------
 @login_required
 def post_login_redirect(request):
-    if request.user.groups.filter(name="Manager").exists():
+    # role_required gates the dashboards on the role field, so route on it too (no groups query)
+    role = getattr(request, '_cached_role', None) or getattr(request.user, 'role', None)
+    if role == ROLE_MANAGER:
         return redirect("manager_dashboard")
     return redirect("employee_dashboard")
 
@@ -409,69 +423,19 @@ def employee_dashboard(request):
     user = request.user
     today = dt.date.today()
 
-    # Projects for timer
-    projects = Project.objects.filter(active=True).order_by("name")
+    # Active Timer (exposed to template as 'running_timer'); the card shows its project name
+    running_timer = TimesheetEntry.objects.filter(user=user, start_time__isnull=False, end_time__isnull=True)\
+        .select_related("project").defer("notes").order_by("-start_time").first()
 
-    # Active Timer (exposed to template as 'running_timer')
-    running_timer = TimesheetEntry.objects.filter(user=user, end_time__isnull=True).order_by("-start_time").first()
-    if running_timer and running_timer.start_time:
-        delta = timezone.now() - running_timer.start_time
-        running_timer.hours = round(delta.total_seconds() / 3600, 2)
-    else:
-        running_timer = None
+    # Projects for the start-timer form, which only renders when no timer is running
+    projects = Project.objects.filter(active=True).only("id", "name").order_by("name") if running_timer is None else []
 
     # Recent Entries (last 5)
-    recent_entries = TimesheetEntry.objects.filter(user=user).order_by("-work_date", "-start_time")[:5]
-    for e in recent_entries:
-        if e.duration_minutes is not None:
-            e.hours = round(e.duration_minutes / 60.0, 2)
-        elif e.start_time:
-            delta = timezone.now() - e.start_time
-            e.hours = round(delta.total_seconds() / 3600, 2)
-        else:
-            e.hours = 0
-
-    # Git-style Year Contribution
-    year_start = dt.date(today.year, 1, 1)
-    year_end = dt.date(today.year, 12, 31)
-    entries_qs = TimesheetEntry.objects.filter(
-        user=user, work_date__range=(year_start, year_end)
-    ).values("work_date").annotate(total_minutes=Coalesce(Sum("duration_minutes"), 0))
-
-    hours_map = {e["work_date"]: e["total_minutes"] / 60 for e in entries_qs}
-
-    cal_data = []
-    week = []
-    current_date = year_start
-    while current_date <= year_end:
-        if current_date.weekday() == 6 and week:
-            cal_data.append(week)
-            week = []
-        week.append({"date": current_date, "hours": hours_map.get(current_date, 0)})
-        current_date += dt.timedelta(days=1)
-    if week:
-        cal_data.append(week)
-
-    # Month labels with precomputed margin
-    month_labels = []
-    # Each week column consumes ~22px (16px block + gaps); calculate margins accordingly
-    week_column_width = 22
-    for month in range(1, 13):
-        first_day = dt.date(today.year, month, 1)
-        week_index = (first_day - year_start).days // 7
-        margin_px = week_index * week_column_width
-        month_labels.append({"name": calendar.month_abbr[month], "margin": margin_px})
-
-    # Build week day pairs (label + date) for current week
-    week_start, _ = get_current_week_bounds(today)
-    week_days = [week_start + dt.timedelta(days=i) for i in range(7)]
-    labels = ['M', 'T', 'W', 'T', 'F', 'S', 'S']
-    week_day_pairs = [{'date': d, 'label': labels[i]} for i, d in enumerate(week_days)]
+    recent_entries = TimesheetEntry.objects.recent(user)
 
-    # compute total minutes for current week
-    entries_week = TimesheetEntry.objects.filter(user=user, work_date__range=(week_start, week_start + dt.timedelta(days=6)))
-    total_minutes = entries_week.aggregate(total_minutes=Coalesce(Sum('duration_minutes'), 0))['total_minutes'] or 0
-    total_hours = round(total_minutes / 60.0, 2)
+    # Year heatmap and current-week widgets
+    cal_data, month_labels, week_day_pairs, this_week_hours, approved_this_week = build_year_calendar(user, today)
+    week_start, _ = get_current_week_bounds(today)
 
     context = {
         "projects": projects,
@@ -483,8 +447,8 @@ def employee_dashboard(request):
         "week_start": week_start,
         "week_day_pairs": week_day_pairs,
         "today": today,
-        "approved_this_week": int(WeekSummary.objects.filter(user=user, week_start=week_start, status=STATUS_APPROVED).exists()),
-        "this_week_hours": total_hours,
+        "approved_this_week": approved_this_week,
+        "this_week_hours": this_week_hours,
     }
 
     return render(request, "dashboard/employee.html", context)
@@ -495,24 +459,18 @@ def employee_dashboard(request):
 def start_time_entry(request):
     user = request.user
     today = timezone.localdate()
-    # Prevent overlapping timers
-    overlapping = TimesheetEntry.objects.filter(
-        user=user,
-        end_time__isnull=True,
-    ).exists()
-
-    if overlapping:
-        messages.warning(request, "You already have a running timer!", extra_tags='dashboard')
-        # If XHR request, return JSON so front-end can update without redirect
-        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-            return JsonResponse({"error": "running"}, status=400)
-        return redirect("employee_dashboard")
-
     if request.method == "POST":
         project_id = request.POST.get("project")
         notes = request.POST.get("notes", "")
         project = Project.objects.filter(id=project_id).first() if project_id else None
 
+        # An approved week is closed: no new entries, timers included
+        if WeekSummary.is_approved(user, today):
+            if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+                return json_response({"error": "approved"}, status=400)
+            messages.error(request, "Cannot start timer: this week has already been approved.", extra_tags='dashboard')
+            return redirect("employee_dashboard")
+
         # Check if overlapping with today entries
         overlapping_today = TimesheetEntry.objects.filter(
             user=user,
@@ -525,39 +483,35 @@ def start_time_entry(request):
             messages.error(request, "Cannot start timer: overlapping entry exists today.", extra_tags='dashboard')
             return redirect("employee_dashboard")
 
-        TimesheetEntry.objects.create(
-            user=user,
-            project=project,
-            start_time=timezone.now(),
-            work_date=today,
-            notes=notes,
-            duration_minutes=0,
-        )
+        # Prevent overlapping timers: the one_running_timer constraint rejects a second running timer
+        try:
+            with transaction.atomic():
+                running_timer = TimesheetEntry.objects.create(
+                    user=user,
+                    project=project,
+                    start_time=timezone.now(),
+                    work_date=today,
+                    notes=notes,
+                )
+        except IntegrityError:
+            messages.warning(request, "You already have a running timer!", extra_tags='dashboard')
+            # If XHR request, return JSON so front-end can update without redirect
+            if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+                return json_response({"error": "running"}, status=400)
+            return redirect("employee_dashboard")
 
         messages.success(request, "Timer started successfully!", extra_tags='dashboard')
 
         # If AJAX request, return updated fragments
         if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-            recent_entries = TimesheetEntry.objects.filter(user=user).order_by("-work_date", "-start_time")[:5]
-            for e in recent_entries:
-                if e.duration_minutes is not None:
-                    e.hours = round(e.duration_minutes / 60.0, 2)
-                elif e.start_time:
-                    delta = timezone.now() - e.start_time
-                    e.hours = round(delta.total_seconds() / 3600, 2)
-                else:
-                    e.hours = 0
-
-            running_timer = TimesheetEntry.objects.filter(user=user, end_time__isnull=True).order_by("-start_time").first()
-            if running_timer and running_timer.start_time:
-                delta = timezone.now() - running_timer.start_time
-                running_timer.hours = round(delta.total_seconds() / 3600, 2)
+            recent_entries = TimesheetEntry.objects.recent(user)
 
+            # the timer just created is the running one; no need to query it back
             recent_html = render_to_string("dashboard/_recent_entries.html", {"recent_entries": recent_entries}, request=request)
-            running_html = render_to_string("dashboard/_running_timer.html", {"running_timer": running_timer, "projects": Project.objects.filter(active=True)}, request=request)
+            running_html = _running_timer_html(request, running_timer, "start_time_entry", "stop_time_entry")
             # include start_ms for client initialization
-            start_ms = int(running_timer.start_time.timestamp() * 1000) if running_timer and running_timer.start_time else None
-            return JsonResponse({"recent_html": recent_html, "running_html": running_html, "start_ms": start_ms})
+            start_ms = int(running_timer.start_time.timestamp() * 1000)
+            return json_response({"recent_html": recent_html, "running_html": running_html, "start_ms": start_ms})
 
     return redirect("employee_dashboard")
 
@@ -570,39 +524,25 @@ def stop_time_entry(request, entry_id):
     if entry.end_time:
         messages.warning(request, "This timer is already stopped!", extra_tags='dashboard')
         return redirect("employee_dashboard")
+    if entry.locked:
+        # the entry's week was approved while the timer ran; its time can no longer change
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            return json_response({"error": "locked"}, status=400)
+        messages.error(request, "This entry belongs to an approved week and can no longer be changed.", extra_tags='dashboard')
+        return redirect("employee_dashboard")
 
     entry.end_time = timezone.now()
-    delta = entry.end_time - entry.start_time
-    entry.duration_minutes = int(delta.total_seconds() / 60)
-    entry.hours = round(delta.total_seconds() / 3600, 2)
     entry.save()
     messages.success(request, f"Timer stopped! Total hours: {entry.hours}", extra_tags='dashboard')
 
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
         # Return updated fragments for AJAX clients
-        recent_entries = TimesheetEntry.objects.filter(user=user).order_by("-work_date", "-start_time")[:5]
-        for e in recent_entries:
-            if e.duration_minutes is not None:
-                e.hours = round(e.duration_minutes / 60.0, 2)
-            elif e.start_time and e.end_time:
-                delta = e.end_time - e.start_time
-                e.hours = round(delta.total_seconds() / 3600, 2)
-            else:
-                e.hours = 0
-
-        running_timer = TimesheetEntry.objects.filter(user=user, end_time__isnull=True).order_by("-start_time").first()
-        if running_timer and running_timer.start_time:
-            delta = timezone.now() - running_timer.start_time
-            running_timer.hours = round(delta.total_seconds() / 3600, 2)
+        recent_entries = TimesheetEntry.objects.recent(user)
 
         recent_html = render_to_string("dashboard/_recent_entries.html", {"recent_entries": recent_entries}, request=request)
-        running_html = render_to_string(
-            "dashboard/_running_timer.html",
-            {"running_timer": running_timer, "projects": Project.objects.filter(active=True), "start_name": 'start_time_entry', "stop_name": 'stop_time_entry'},
-            request=request,
-        )
-        start_ms = int(running_timer.start_time.timestamp() * 1000) if running_timer and running_timer.start_time else None
-        return JsonResponse({"recent_html": recent_html, "running_html": running_html, "start_ms": start_ms})
+        # the only running timer was just stopped, so render the start form directly
+        running_html = _running_timer_html(request, None, "start_time_entry", "stop_time_entry")
+        return json_response({"recent_html": recent_html, "running_html": running_html, "start_ms": None})
 
     # Non-AJAX: simple redirect back to dashboard
     return redirect("employee_dashboard")
@@ -617,50 +557,17 @@ def manager_dashboard(request):
         .order_by("week_start")
     today = timezone.localdate()
     month_start = today.replace(day=1)
-    approved_this_month = WeekSummary.objects.filter(
-        status=STATUS_APPROVED,
-        approved_at__date__gte=month_start
-    ).count()
+    # Compare the raw column (no __date cast) so the (status, approved_at) index applies
+    month_start_dt = timezone.make_aware(dt.datetime.combine(month_start, dt.time.min))
+    approved_this_month = WeekSummary.objects.filter(status=STATUS_APPROVED, approved_at__gte=month_start_dt).count()
 
     # Users to show in manager dashboard (exclude superusers if desired)
-    employees = User.objects.filter(groups__name='Employee').order_by('username')
-    projects = Project.objects.all().order_by('name')
+    employees = User.objects.filter(groups__name='Employee').only('id', 'username', 'first_name', 'last_name', 'email').order_by('username')
+    # the dashboard lists names and edit links only
+    projects = Project.objects.only('id', 'name').order_by('name')
 
     # Also include manager's personal dashboard widgets: calendar graph and weekly UI
-    # Git-style Year Contribution for manager (their own entries)
-    year_start = dt.date(today.year, 1, 1)
-    year_end = dt.date(today.year, 12, 31)
-    entries_qs = TimesheetEntry.objects.filter(user=request.user, work_date__range=(year_start, year_end)).values("work_date").annotate(total_minutes=Coalesce(Sum("duration_minutes"), 0))
-    hours_map = {e["work_date"]: e["total_minutes"] / 60 for e in entries_qs}
-    cal_data = []
-    week = []
-    current_date = year_start
-    while current_date <= year_end:
-        if current_date.weekday() == 6 and week:
-            cal_data.append(week)
-            week = []
-        week.append({"date": current_date, "hours": hours_map.get(current_date, 0)})
-        current_date += dt.timedelta(days=1)
-    if week:
-        cal_data.append(week)
-
-    # Month labels
-    month_labels = []
-    week_column_width = 22
-    for month in range(1,13):
-        first_day = dt.date(today.year, month, 1)
-        week_index = (first_day - year_start).days // 7
-        margin_px = week_index * week_column_width
-        month_labels.append({"name": calendar.month_abbr[month], "margin": margin_px})
-
-    # week_day_pairs
-    week_start, _ = get_current_week_bounds(today)
-    week_days = [week_start + dt.timedelta(days=i) for i in range(7)]
-    labels = ['M','T','W','T','F','S','S']
-    week_day_pairs = [{'date': d, 'label': labels[i]} for i, d in enumerate(week_days)]
-    entries_week = TimesheetEntry.objects.filter(user=request.user, work_date__range=(week_start, week_start + dt.timedelta(days=6)))
-    total_minutes = entries_week.aggregate(total_minutes=Coalesce(Sum('duration_minutes'), 0))['total_minutes'] or 0
-    total_hours = round(total_minutes / 60.0, 2)
+    cal_data, month_labels, week_day_pairs, this_week_hours, approved_this_week = build_year_calendar(request.user, today)
 
     context = {
         "pending_weeks": pending_weeks,
@@ -673,8 +580,8 @@ def manager_dashboard(request):
         "month_labels": month_labels,
         "week_day_pairs": week_day_pairs,
         "today": today,
-        "this_week_hours": total_hours,
-        "approved_this_week": int(WeekSummary.objects.filter(user=request.user, week_start=week_start, status=STATUS_APPROVED).exists()),
+        "this_week_hours": this_week_hours,
+        "approved_this_week": approved_this_week,
     }
     return render(request, "dashboard/manager.html", context)
 
@@ -683,39 +590,54 @@ def manager_dashboard(request):
 @role_required("manager")
 @login_required
 def approvals_list(request):
-    pending = WeekSummary.objects.select_related('user').filter(status=STATUS_SUBMITTED).order_by('week_start')
-    approved = WeekSummary.objects.select_related('user').filter(status=STATUS_APPROVED).order_by('-approved_at')[:50]
-    rejected = WeekSummary.objects.select_related('user').filter(status=STATUS_REJECTED).order_by('-approved_at')[:50]
+    # One round trip for all three lists, bucketed by status below: every pending week,
+    # but only the 50 most recently decided approved and rejected weeks (numbered per status)
+    weeks = WeekSummary.objects.select_related('user')\
+        .filter(status__in=[STATUS_SUBMITTED, STATUS_APPROVED, STATUS_REJECTED])\
+        .annotate(row_number=Window(RowNumber(), partition_by=F('status'), order_by=F('approved_at').desc()))\
+        .filter(Q(status=STATUS_SUBMITTED) | Q(row_number__lte=50))\
+        .order_by('-approved_at', 'week_start')
+    buckets = {STATUS_SUBMITTED: [], STATUS_APPROVED: [], STATUS_REJECTED: []}
+    for week in weeks:
+        buckets[week.status].append(week)
+    pending = sorted(buckets[STATUS_SUBMITTED], key=lambda w: w.week_start)
+    approved = buckets[STATUS_APPROVED]
+    rejected = buckets[STATUS_REJECTED]
     return render(request, 'dashboard/approvals_list.html', {'pending': pending, 'approved': approved, 'rejected': rejected})
 
 
 @role_required('manager')
 @login_required
 def week_detail(request, week_id):
-    week = get_object_or_404(WeekSummary, pk=week_id)
-    entries = TimesheetEntry.objects.filter(user=week.user, work_date__range=(week.week_start, week.week_start + dt.timedelta(days=6))).select_related('project')
+    week = get_object_or_404(WeekSummary.objects.select_related('user'), pk=week_id)
+    entries = TimesheetEntry.objects.filter(
+        user_id=week.user_id, work_date__range=get_current_week_bounds(week.week_start)
+    )
     if request.method == 'POST':
         action = request.POST.get('action')
         note = request.POST.get('note', '')
         manager_comment = request.POST.get('manager_comment', '')
-        if action == 'approve':
-            week.status = STATUS_APPROVED
-            week.approver = request.user
-            week.approved_at = timezone.now()
-            week.audit_note = note
-            week.manager_comment = manager_comment
-            week.save()
-            messages.success(request, 'Week approved.')
-        elif action == 'reject':
-            week.status = STATUS_REJECTED
-            week.approver = request.user
-            week.approved_at = timezone.now()
-            week.audit_note = note
-            week.manager_comment = manager_comment
-            week.save()
-            messages.success(request, 'Week rejected.')
+        if action in ('approve', 'reject'):
+            fields = {
+                'status': STATUS_APPROVED if action == 'approve' else STATUS_REJECTED,
+                'approver': request.user,
+                'approved_at': timezone.now(),
+                'audit_note': note,
+                'manager_comment': manager_comment,
+            }
+            # update() only writes these columns, so the denormalized totals are never overwritten
+            if not WeekSummary.objects.filter(pk=week.pk).update(**fields):
+                raise Http404
+            # one UPDATE for the whole week: approved entries are locked, rejected ones reopened
+            entries.update(locked=action == 'approve')
+            messages.success(request, 'Week approved.' if action == 'approve' else 'Week rejected.')
         return redirect('approvals_list')
-    return render(request, 'dashboard/week_detail.html', {'week': week, 'entries': entries})
+    # Evaluate once with just the rendered columns; the total comes from the summary row
+    entries = list(entries.select_related('project').only(
+        'work_date', 'start_time', 'end_time', 'duration_minutes', 'project__name',
+    ))
+    total_hours = round(week.total_minutes / 60.0, 2)
+    return render(request, 'dashboard/week_detail.html', {'week': week, 'entries': entries, 'total_hours': total_hours})
 
 
 @role_required('employee')
@@ -723,57 +645,70 @@ def week_detail(request, week_id):
 def submit_week(request):
     # Submits the current user's week summary for manager review
     week_start, week_end = get_current_week_bounds()
-    week, created = WeekSummary.objects.get_or_create(user=request.user, week_start=week_start)
-    week.status = STATUS_SUBMITTED
-    week.submitted_at = timezone.now()
-    week.save()
+    # Validate the whole week's entries for overlaps in one query before submitting
+    overlap_ids = list(TimesheetEntry.overlapping_in_range(request.user.pk, week_start, week_end).values_list('pk', flat=True))
+    if overlap_ids:
+        messages.error(request, f"Cannot submit week: entries {', '.join(map(str, overlap_ids))} overlap.")
+        return redirect('my_timesheet')
+    fields = {'status': STATUS_SUBMITTED, 'submitted_at': timezone.now()}
+    # Only a draft or rejected week can be (re)submitted; never reopen an approved one
+    open_weeks = WeekSummary.objects.filter(
+        user=request.user, week_start=week_start, status__in=[STATUS_DRAFT, STATUS_REJECTED]
+    )
+    if not open_weeks.update(**fields):
+        week, created = WeekSummary.objects.get_or_create(user=request.user, week_start=week_start, defaults=fields)
+        # the row may have appeared as a draft since the UPDATE; submit it then
+        if not created and not open_weeks.update(**fields):
+            if week.status == STATUS_APPROVED:
+                messages.error(request, 'This week has already been approved.')
+            else:
+                messages.error(request, 'This week has already been submitted for approval.')
+            return redirect('my_timesheet')
     messages.success(request, 'Week submitted for approval.')
     return redirect('my_timesheet')
 
 
 # ------------------- Manager Reports -------------------
+def _project_hours_rows(start, end):
+    """(rows, total_hours) of hours per project between start and end, all employees."""
+    # One GROUP BY project row with total and billable minutes
+    totals = (
+        TimesheetEntry.objects.filter(work_date__range=(start, end))
+        .order_by()
+        .values(pname=Coalesce('project__name', Value('Unassigned')))
+        .annotate(
+            total_minutes=Coalesce(Sum('duration_minutes'), 0),
+            billable_minutes=Sum(Case(When(billable=True, then=F('duration_minutes')), default=Value(0), output_field=IntegerField())),
+        )
+    )
+    totals = list(totals)
+    rows = [
+        {
+            'project': r['pname'],
+            'hours': round(r['total_minutes'] / 60.0, 2),
+            'billable_hours': round((r['billable_minutes'] or 0) / 60.0, 2),
+            'percent_billable': round(100 * (r['billable_minutes'] or 0) / r['total_minutes'], 2) if r['total_minutes'] else 0,
+        }
+        for r in totals
+    ]
+    return rows, sum(r['total_minutes'] for r in totals) / 60.0
+
+
 @role_required('manager')
 @login_required
 def manager_reports(request):
     # Hours by project within date range
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
-    try:
-        start = dt.date.fromisoformat(start_date) if start_date else dt.date.today() - dt.timedelta(days=30)
-    except Exception:
-        start = dt.date.today() - dt.timedelta(days=30)
-    try:
-        end = dt.date.fromisoformat(end_date) if end_date else dt.date.today()
-    except Exception:
-        end = dt.date.today()
-
-    qs = TimesheetEntry.objects.filter(work_date__range=(start, end)).select_related('project')
-    project_map = defaultdict(float)
-    billable_map = defaultdict(float)
-    for e in qs:
-        h = (e.duration_minutes or 0) / 60.0
-        name = e.project.name if e.project else 'Unassigned'
-        project_map[name] += h
-        if e.billable:
-            billable_map[name] += h
-
-    rows = []
-    total_hours = sum(project_map.values())
-    for name, hrs in project_map.items():
-        bill = billable_map.get(name, 0.0)
-        pct_bill = round((bill / hrs * 100) if hrs else 0, 2)
-        rows.append({'project': name, 'hours': round(hrs,2), 'billable_hours': round(bill,2), 'percent_billable': pct_bill})
+    today = dt.date.today()
+    start = (start_date and parse_query_date(start_date)) or today - dt.timedelta(days=30)
+    end = (end_date and parse_query_date(end_date)) or today
+
+    rows, total_hours = _project_hours_rows(start, end)
 
     # CSV export option
     if request.GET.get('export') == 'csv':
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
-        response['Content-Disposition'] = 'attachment; filename="hours_by_project.csv"'
-        response.write('\ufeff')
-        writer = csv.writer(response)
-        writer.writerow(['Project','Hours','Billable Hours','% Billable'])
-        for r in rows:
-            writer.writerow([r['project'], f"{r['hours']:.2f}", f"{r['billable_hours']:.2f}", f"{r['percent_billable']:.2f}"])
-        return response
+        return _csv_response(_project_hours_csv_lines(rows), 'hours_by_project.csv')
 
     return render(request, 'dashboard/manager_reports.html', {'rows': rows, 'start': start, 'end': end, 'total_hours': total_hours})
 
@@ -782,8 +717,8 @@ def manager_reports(request):
 @role_required('manager')
 @login_required
 def projects_list(request):
-    projects = Project.objects.all().order_by('name')
-    return render(request, 'dashboard/projects_list.html', {'projects': projects})
+    page_obj = Paginator(Project.objects.all().order_by('name'), 50).get_page(request.GET.get('page'))
+    return render(request, 'dashboard/projects_list.html', {'projects': page_obj, 'page_obj': page_obj})
 
 
 @role_required('manager')
@@ -842,13 +777,11 @@ def add_edit_entry(request, entry_id=None):
             # Compose start_time and end_time from date + time fields if provided
             start_time_field = form.cleaned_data.get('start_time_time')
             end_time_field = form.cleaned_data.get('end_time_time')
+            tz = timezone.get_current_timezone()
             if start_time_field:
-                obj.start_time = timezone.make_aware(dt.datetime.combine(obj.work_date, start_time_field))
+                obj.start_time = dt.datetime.combine(obj.work_date, start_time_field, tzinfo=tz)
             if end_time_field:
-                obj.end_time = timezone.make_aware(dt.datetime.combine(obj.work_date, end_time_field))
-            if obj.start_time and obj.end_time:
-                delta = obj.end_time - obj.start_time
-                obj.duration_minutes = int(delta.total_seconds() / 60)
+                obj.end_time = dt.datetime.combine(obj.work_date, end_time_field, tzinfo=tz)
             obj.save()
             messages.success(request, f"✅ Time entry saved successfully (id={obj.id}, date={obj.work_date}).")
             return redirect("employee_dashboard")
@@ -871,6 +804,9 @@ def add_edit_entry(request, entry_id=None):
 def delete_entry(request, entry_id):
     entry = get_object_or_404(TimesheetEntry, pk=entry_id, user=request.user)
     if request.method == 'POST':
+        if entry.locked:
+            messages.error(request, "This entry belongs to an approved week and can no longer be deleted.")
+            return redirect('employee_dashboard')
         entry.delete()
         messages.success(request, "Entry deleted.")
         return redirect('employee_dashboard')
@@ -883,6 +819,9 @@ def manager_delete_entry(request, entry_id):
     # Allow manager to delete their own entries (manager-scoped)
     entry = get_object_or_404(TimesheetEntry, pk=entry_id, user=request.user)
     if request.method == 'POST':
+        if entry.locked:
+            messages.error(request, "This entry belongs to an approved week and can no longer be deleted.")
+            return redirect('manager_my_timesheet')
         entry.delete()
         messages.success(request, "Entry deleted.")
         return redirect('manager_my_timesheet')
@@ -894,26 +833,9 @@ def manager_delete_entry(request, entry_id):
 @login_required
 def my_timesheet(request):
     week_start, week_end = get_current_week_bounds()
-    entries = TimesheetEntry.objects.filter(
-        user=request.user,
-        work_date__range=(week_start, week_end)
-    ).order_by("work_date", "start_time")
+    entries = TimesheetEntry.objects.for_week(request.user, week_start).order_by("work_date", "start_time")
 
-    week_summary, _ = WeekSummary.objects.get_or_create(
-        user=request.user, week_start=week_start, defaults={"status": STATUS_DRAFT}
-    )
-
-    # Compute per-entry hours for template display (hours as float)
-    for e in entries:
-        if e.duration_minutes is not None:
-            e.hours = round(e.duration_minutes / 60.0, 2)
-        elif e.start_time and e.end_time:
-            delta = e.end_time - e.start_time
-            e.hours = round(delta.total_seconds() / 3600, 2)
-        else:
-            e.hours = 0
-
-    total_minutes = entries.aggregate(total_minutes=Coalesce(Sum("duration_minutes"), 0))["total_minutes"]
+    week_status, total_minutes = get_week_status(request.user, week_start)
     total_hours = round(total_minutes / 60.0, 2)
 
     context = {
@@ -921,7 +843,7 @@ def my_timesheet(request):
         "week_start": week_start,
         "week_end": week_end,
         "total_hours": total_hours,
-        "week_status": week_summary.status,
+        "week_status": week_status,
     }
     return render(request, "dashboard/employee_mytimesheet.html", context)
 
@@ -938,38 +860,15 @@ def my_reports(request):
     project_id = request.GET.get("project")
 
     today = dt.date.today()
-    def _parse_query_date(s, default):
-        if not s:
-            return default
-        # Normalize common query formats (remove dots from abbreviated months like 'Aug.')
-        s_clean = s.replace('.', '').strip()
-        # Try a few common formats
-        formats = [
-            "%Y-%m-%d",
-            "%B %d, %Y",  # July 20, 2025
-            "%b %d, %Y",  # Jul 20, 2025 or Aug 19, 2025
-            "%m/%d/%Y",   # 07/20/2025
-            "%d-%m-%Y",
-        ]
-        for fmt in formats:
-            try:
-                return dt.datetime.strptime(s_clean, fmt).date()
-            except Exception:
-                continue
-        # Try ISO parse as last resort
-        try:
-            return dt.date.fromisoformat(s_clean)
-        except Exception:
-            # Fall back to default and warn the user instead of raising an exception
-            messages.warning(request, f"Could not parse date '{s}'; using default range.")
-            return default
-
-    start_date = _parse_query_date(start_date, today - dt.timedelta(days=30))
-    end_date = _parse_query_date(end_date, today)
+    start_date = _query_date(request, start_date, today - dt.timedelta(days=30))
+    end_date = _query_date(request, end_date, today)
 
+    # Join the project and load just the columns the table and exports show
     entries_qs = TimesheetEntry.objects.filter(
         user=user,
         work_date__range=(start_date, end_date)
+    ).select_related("project").only(
+        "work_date", "start_time", "end_time", "break_minutes", "duration_minutes", "notes", "project__name",
     ).order_by("work_date", "start_time")
 
     if project_id:
@@ -978,61 +877,32 @@ def my_reports(request):
         except ValueError:
             pass
 
-    entries = []
-    for e in entries_qs:
-        if e.duration_minutes is not None:
-            e.hours = round(e.duration_minutes / 60.0, 2)
-        else:
-            e.hours = 0
-        entries.append(e)
-
-    # Summary
-    summary_dict = defaultdict(float)
-    for e in entries:
-        name = e.project.name if e.project else "Unassigned"
-        summary_dict[name] += e.hours
-    summary_rows = [{"name": k, "hours": round(v, 2)} for k, v in summary_dict.items()]
-
-    # Chart data
-    chart_dict = defaultdict(float)
-    for e in entries:
-        chart_dict[e.work_date.strftime("%d-%m-%Y")] += e.hours
-    chart_labels = list(chart_dict.keys())
-    chart_data = [chart_dict[d] for d in chart_labels]
-
-    # CSV Export
+    # CSV Export (UTF-8 with BOM so Excel opens files correctly on Windows)
     export = request.GET.get("export", "").lower()
-    if export in {"summary", "details"}:
-        # Use explicit UTF-8 charset and BOM so Excel opens files correctly on Windows.
-        filename = f"timesheet_{export}.csv"
-        response = HttpResponse(content_type="text/csv; charset=utf-8")
-        response["Content-Disposition"] = f'attachment; filename="{filename}"'
-        # Write UTF-8 BOM
-        response.write('\ufeff')
-        # Use lineterminator to avoid extra blank lines on some platforms
-        writer = csv.writer(response, lineterminator='\n')
-
-        if export == "summary":
-            writer.writerow(["Project", "Total Hours"])
-            for row in summary_rows:
-                name = row.get("name", "")
-                hours = row.get("hours", 0)
-                writer.writerow([str(name), f"{float(hours):.2f}"])
-        else:
-            writer.writerow(["Date", "Project", "Start", "End", "Break (min)", "Hours", "Notes"])
-            for e in entries:
-                date_str = e.work_date.strftime("%d-%m-%Y") if getattr(e, 'work_date', None) else ""
-                project_name = e.project.name if getattr(e, 'project', None) else "Unassigned"
-                start_str = e.start_time.strftime("%H:%M") if getattr(e, 'start_time', None) else ""
-                end_str = e.end_time.strftime("%H:%M") if getattr(e, 'end_time', None) else ""
-                break_min = getattr(e, 'break_minutes', 0) or 0
-                hours_val = getattr(e, 'hours', 0) or 0
-                notes = getattr(e, 'notes', '') or ''
-                writer.writerow([date_str, project_name, start_str, end_str, str(break_min), f"{float(hours_val):.2f}", notes])
-        return response
+    if export == "details":
+        # stream straight off the cursor so a long range is never held in memory
+        return _csv_response(_detail_csv_lines(entries_qs), "timesheet_details.csv")
+
+    # Summary: per-project totals grouped in SQL
+    summary_totals = (
+        entries_qs.order_by("project__name")
+        .values(pname=Coalesce("project__name", Value("Unassigned")))
+        .annotate(total_minutes=Coalesce(Sum("duration_minutes"), 0))
+    )
+    summary_rows = [{"name": r["pname"], "hours": round(r["total_minutes"] / 60.0, 2)} for r in summary_totals]
+
+    if export == "summary":
+        return _csv_response(_summary_csv_lines(summary_rows), "timesheet_summary.csv")
+
+    # Chart data: per-day totals grouped in SQL
+    chart_rows = list(
+        entries_qs.order_by("work_date").values("work_date").annotate(total_minutes=Coalesce(Sum("duration_minutes"), 0))
+    )
+    chart_labels = [r["work_date"].strftime("%d-%m-%Y") for r in chart_rows]
+    chart_data = [round(r["total_minutes"] / 60.0, 2) for r in chart_rows]
 
     context = {
-        "entries": entries,
+        "entries": entries_qs,
         "projects": projects,
         "summary_rows": summary_rows,
         "chart_labels": chart_labels,